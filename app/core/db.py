@@ -10,8 +10,15 @@ DB 接続まわりをまとめるモジュール。
 を定義する。
 
 FastAPI からは:
-  from core.db import Base, engine, SessionLocal
+  from core.db import Base, get_engine, SessionLocal
 のように import して使う。
+
+engine は import 時には作らず、get_engine() を最初に呼んだときに作る。
+gunicorn の preload_app で親プロセスが app を import しても
+DB 接続（コネクションプール）は fork 後の各ワーカーで別々に作られる。
+
+テーブル作成（init_db）は import 時ではなく、
+マイグレーション用の 1 回きりのステップ（python -m migrate）で行う。
 """
 
 import os  # 環境変数（os.getenv）を読むための標準ライブラリ
@@ -26,6 +33,8 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "weatherpass")
 DB_NAME = os.getenv("DB_NAME", "weatherdb")
 DB_HOST = os.getenv("DB_HOST", "db")    # docker-compose のサービス名
 DB_PORT = os.getenv("DB_PORT", "5432")
+# "1" なら実行される SQL をログに出す（本番では 0 にする）
+DB_ECHO = os.getenv("DB_ECHO", "1") == "1"
 
 
 # f文字列: f"...{変数}..." で文字列に値を埋め込む
@@ -34,18 +43,64 @@ SQLALCHEMY_DATABASE_URL = (
     f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
-# create_engine(...) で DB と話すための本体を作る
-# echo=True にすると実行される SQL がコンソールに出てきてデバッグに便利
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True)
-
 # sessionmaker は「Session クラスを作る工場」のようなもの
 # ここで設定した内容を元に、あとで SessionLocal() でセッションインスタンスを作る
+# bind（どの engine を使うか）は get_engine() が engine を作ったときに設定する
 SessionLocal = sessionmaker(
     autocommit=False,  # 自動コミットしない（明示的に commit を呼ぶ）
     autoflush=False,   # 自動フラッシュもしない（基本これでOK）
-    bind=engine,       # この Session は上で作った engine を使う
 )
 
 # declarative_base() は「全モデルの基底クラス」を作る関数
 # この Base を継承したクラスがテーブルとして扱われる
 Base = declarative_base()
+
+_engine = None
+
+
+def get_engine():
+    """
+    engine を（まだなければ）作って返す。プロセスごとに 1 つだけ作る。
+
+    create_engine(...) で DB と話すための本体を作る
+    echo=True にすると実行される SQL がコンソールに出てきてデバッグに便利
+    pool_pre_ping=True で、切れたコネクションを使う前に検知して張り直す
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            SQLALCHEMY_DATABASE_URL,
+            echo=DB_ECHO,
+            pool_pre_ping=True,
+        )
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def dispose_engine() -> None:
+    """
+    fork 後のワーカーで呼ぶ。親プロセスから引き継いだ engine があれば
+    コネクションを閉じずに（親が使っているので）手放し、次の get_engine() で作り直す。
+    """
+    global _engine
+    if _engine is not None:
+        _engine.dispose(close=False)
+        _engine = None
+
+
+def init_db() -> None:
+    """
+    Base を継承したすべてのモデルのテーブルを作成する。
+
+    すでにテーブルが存在する場合は何もしない。
+    モデルを import してから呼ぶこと（import されたモデルだけが Base に登録される）。
+
+    create_all は既存テーブルにあとから足したインデックス
+    （例: ix_forecasts_lat_lon_time）を作らないので、
+    モデルに定義されたインデックスは 1 つずつ checkfirst=True で作る。
+    """
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
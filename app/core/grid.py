@@ -0,0 +1,126 @@
+# app/core/grid.py
+
+"""
+予報格子（緯度・経度の等間隔グリッド）の定義をまとめるモジュール。
+
+GSM 全球サンプル (numberOfPoints=65160) は 1.0度格子:
+  - 緯度: 90 → -90 （181点, 北から南へ）
+  - 経度: 0 → 359  （360点）
+
+任意の地点 (lat, lon) から「最寄りの格子点」を求めるときに使う。
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class GridSpec:
+    """
+    等間隔の緯度経度グリッド。
+
+    lat0/lon0 は先頭の格子点、dlat/dlon は格子間隔（dlat は北→南なら負）。
+    """
+
+    lat0: float
+    lon0: float
+    dlat: float
+    dlon: float
+    nlat: int
+    nlon: int
+
+    @classmethod
+    def from_coords(cls, lats, lons) -> "GridSpec":
+        """xarray の latitude/longitude 座標（等間隔）から GridSpec を作る。"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        return cls(
+            lat0=float(lats[0]),
+            lon0=float(lons[0]),
+            dlat=float(lats[1] - lats[0]) if lats.size > 1 else 1.0,
+            dlon=float(lons[1] - lons[0]) if lons.size > 1 else 1.0,
+            nlat=int(lats.size),
+            nlon=int(lons.size),
+        )
+
+    @property
+    def is_global_lon(self) -> bool:
+        """経度方向に地球を一周しているか（していれば経度インデックスを巡回させる）。"""
+        return abs(self.nlon * self.dlon - 360.0) < 1e-6
+
+    def locate(self, lat, lon) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        最寄り格子点のインデックス (i, j) と、その点がグリッド内かどうかのマスクを返す。
+        経度は 0-360 に正規化してから計算する（-180〜180 で来てもよい）。
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.mod(np.asarray(lon, dtype=np.float64) - self.lon0, 360.0)
+
+        i = np.rint((lat - self.lat0) / self.dlat).astype(np.int64)
+        j = np.rint(lon / self.dlon).astype(np.int64)
+        if self.is_global_lon:
+            j = np.mod(j, self.nlon)
+
+        inside = (i >= 0) & (i < self.nlat) & (j >= 0) & (j < self.nlon)
+        return i, j, inside
+
+    def nearest_index(self, lat, lon) -> tuple[np.ndarray, np.ndarray]:
+        """
+        最寄り格子点のインデックス (i, j) を返す。配列でもスカラーでも OK。
+        グリッド外の点は端の格子点に寄せる。
+        """
+        i, j, _ = self.locate(lat, lon)
+        return np.clip(i, 0, self.nlat - 1), np.clip(j, 0, self.nlon - 1)
+
+    def index_to_latlon(self, i, j) -> tuple[np.ndarray, np.ndarray]:
+        """インデックス (i, j) → 格子点の (lat, lon)。"""
+        lat = self.lat0 + np.asarray(i, dtype=np.float64) * self.dlat
+        lon = self.lon0 + np.asarray(j, dtype=np.float64) * self.dlon
+        return lat, lon
+
+    def latitudes(self) -> np.ndarray:
+        return self.lat0 + np.arange(self.nlat) * self.dlat
+
+    def longitudes(self) -> np.ndarray:
+        return self.lon0 + np.arange(self.nlon) * self.dlon
+
+    def lat_slice(self, lat_min: float, lat_max: float) -> slice | None:
+        """緯度範囲 [lat_min, lat_max] に入る格子の slice（緯度は単調なので必ず連続区間）。"""
+        lats = self.latitudes()
+        idx = np.nonzero((lats >= lat_min) & (lats <= lat_max))[0]
+        if idx.size == 0:
+            return None
+        return slice(int(idx[0]), int(idx[-1]) + 1)
+
+    def lon_index(self, lon_min: float, lon_max: float) -> slice | np.ndarray | None:
+        """
+        経度範囲 [lon_min, lon_max] に入る格子。0-360 に正規化して比較する。
+        連続区間なら slice、0度線をまたぐときだけインデックス配列を返す。
+        """
+        lons = np.mod(self.longitudes(), 360.0)
+        lo = lon_min % 360.0
+        hi = lon_max % 360.0
+        if lon_max - lon_min >= 360.0:
+            mask = np.ones_like(lons, dtype=bool)
+        elif lo <= hi:
+            mask = (lons >= lo) & (lons <= hi)
+        else:
+            mask = (lons >= lo) | (lons <= hi)
+
+        idx = np.nonzero(mask)[0]
+        if idx.size == 0:
+            return None
+        if idx[-1] - idx[0] + 1 == idx.size:
+            return slice(int(idx[0]), int(idx[-1]) + 1)
+        # 0度線をまたぐ場合は西端（lo 側）から東へ並べる
+        # （切り出した座標も等間隔のまま GridSpec.from_coords で扱えるように）
+        return np.concatenate([idx[lons[idx] >= lo], idx[lons[idx] < lo]])
+
+    def nearest_latlon(self, lat, lon) -> tuple[np.ndarray, np.ndarray]:
+        """最寄り格子点の (lat, lon) を返す。DB に入っている座標と一致する値になる。"""
+        return self.index_to_latlon(*self.nearest_index(lat, lon))
+
+
+# 気象庁 GSM 全球サンプル（ingest が読み込んでいるもの）
+GSM_GLOBAL = GridSpec(lat0=90.0, lon0=0.0, dlat=-1.0, dlon=1.0, nlat=181, nlon=360)
@@ -0,0 +1,290 @@
+# app/core/grid_store.py
+
+"""
+予報グリッドをローカルファイルに置いて、API から直接読むためのモジュール。
+
+PostgreSQL が正（system of record）なのは変わらない。
+ここは「点・矩形の読み取りを DB 往復なしで返す」ための読み取り専用コピー。
+
+ディレクトリ構成:
+  {GRID_STORE_DIR}/
+    20171205T0000Z/            ← run_time（予報サイクル）
+      f006/                    ← step（run_time からの時間）
+        temp_2m.npy            ← 2次元配列 (lat, lon)。np.memmap で読む
+        temp_2m.json           ← グリッドヘッダ（格子定義・時刻・単位）
+
+- ingest 側: remove_runs() で DB から消した run を消し、write_grid() で 1 run/step/変数ずつ書く
+- API 側   : GridStore が .npy を np.load(mmap_mode="r") で開く
+             → ワーカープロセス間で OS のページキャッシュを共有できる
+             → スライスはコピーなし（ビュー）で取れる
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from core.grid import GridSpec
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent   # .../app
+GRID_STORE_DIR = Path(os.getenv("GRID_STORE_DIR", str(BASE_DIR / "data" / "grids")))
+
+RUN_DIR_FORMAT = "%Y%m%dT%H%MZ"
+
+
+def _run_dir_name(run_time: datetime) -> str:
+    return run_time.strftime(RUN_DIR_FORMAT)
+
+
+def _step_dir_name(run_time: datetime, forecast_time: datetime) -> str:
+    hours = int((forecast_time - run_time).total_seconds() // 3600)
+    return f"f{hours:03d}"
+
+
+def write_grid(
+    root: Path,
+    run_time: datetime,
+    forecast_time: datetime,
+    variable: str,
+    values: np.ndarray,
+    grid: GridSpec,
+    units: str | None = None,
+) -> Path:
+    """
+    1 run/step/変数ぶんの 2 次元配列 (lat, lon) を .npy + .json で保存する。
+
+    書き込み途中のファイルを API が読まないように、
+    一時ファイルに書いてから os.replace で差し替える。
+    ヘッダ (.json) を先に差し替え、配列 (.npy) は最後に差し替える。
+    その間に読まれても、読み取り側（_open_grid）が形の不一致をはじく。
+    """
+    # DB（Float = double precision）と同じ値を返せるよう float64 のまま持つ
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if values.shape != (grid.nlat, grid.nlon):
+        raise ValueError(
+            f"grid shape mismatch for {variable}: "
+            f"{values.shape} != ({grid.nlat}, {grid.nlon})"
+        )
+
+    out_dir = root / _run_dir_name(run_time) / _step_dir_name(run_time, forecast_time)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    header: Dict[str, Any] = {
+        "variable": variable,
+        "units": units,
+        "run_time": run_time.isoformat(),
+        "forecast_time": forecast_time.isoformat(),
+        "dtype": str(values.dtype),
+        "lat0": grid.lat0,
+        "lon0": grid.lon0,
+        "dlat": grid.dlat,
+        "dlon": grid.dlon,
+        "nlat": grid.nlat,
+        "nlon": grid.nlon,
+    }
+
+    json_path = out_dir / f"{variable}.json"
+    tmp_json = out_dir / f".{variable}.json.tmp"
+    tmp_json.write_text(json.dumps(header, ensure_ascii=False, indent=2))
+    os.replace(tmp_json, json_path)
+
+    npy_path = out_dir / f"{variable}.npy"
+    tmp_npy = out_dir / f".{variable}.npy.tmp"
+    with tmp_npy.open("wb") as f:
+        np.save(f, values)
+    os.replace(tmp_npy, npy_path)
+
+    return npy_path
+
+
+def remove_runs(root: Path, keep: tuple[datetime, ...] = ()) -> int:
+    """
+    keep 以外の run ディレクトリを削除する。削除した数を返す。
+
+    ingest は DB の forecasts を入れ替えるので、DB にもう無い run を
+    グリッドストアから返さないよう、書き込み前にこれを呼ぶ。
+    """
+    if not root.is_dir():
+        return 0
+    keep_names = {_run_dir_name(run_time) for run_time in keep}
+    removed = 0
+    for p in root.iterdir():
+        try:
+            datetime.strptime(p.name, RUN_DIR_FORMAT)
+        except ValueError:
+            continue
+        if p.is_dir() and p.name not in keep_names:
+            shutil.rmtree(p)
+            removed += 1
+    return removed
+
+
+@lru_cache(maxsize=1024)
+def _open_grid(npy_path: str, npy_mtime_ns: int, json_mtime_ns: int) -> tuple[dict, np.ndarray]:
+    """
+    ヘッダと memmap を開く。両ファイルの mtime をキーに含めるので、
+    ingest がどちらかを差し替えたら次のアクセスで開き直す。
+
+    ヘッダと配列の形が合わない（差し替えの途中）ときは ValueError。
+    例外は lru_cache に載らないので、次のアクセスで読み直される。
+    """
+    header = json.loads(Path(npy_path).with_suffix(".json").read_text())
+    values = np.load(npy_path, mmap_mode="r")
+    if values.shape != (header["nlat"], header["nlon"]):
+        raise ValueError(
+            f"grid header does not match {npy_path}: "
+            f"{values.shape} != ({header['nlat']}, {header['nlon']})"
+        )
+    return header, values
+
+
+class GridStore:
+    """
+    GRID_STORE_DIR 以下のグリッドを読む読み取り専用ストア。
+
+    ファイルはリクエスト時に初めて開く（import 時や fork 前には開かない）。
+    """
+
+    def __init__(self, root: Path = GRID_STORE_DIR):
+        self.root = Path(root)
+
+    def latest_run(self) -> datetime | None:
+        """一番新しい run_time を返す。データがなければ None。"""
+        if not self.root.is_dir():
+            return None
+        runs = []
+        for p in self.root.iterdir():
+            try:
+                runs.append(datetime.strptime(p.name, RUN_DIR_FORMAT))
+            except ValueError:
+                continue
+        return max(runs) if runs else None
+
+    def has_run(self, run_time: datetime | None = None) -> bool:
+        if run_time is None:
+            return self.latest_run() is not None
+        return (self.root / _run_dir_name(run_time)).is_dir()
+
+    def _steps(self, run_time: datetime) -> List[Dict[str, tuple[dict, np.ndarray]]]:
+        """run_time の各 step について {変数名: (header, memmap)} を返す。"""
+        run_dir = self.root / _run_dir_name(run_time)
+        steps = []
+        for step_dir in sorted(p for p in run_dir.iterdir() if p.is_dir()):
+            grids = {}
+            for npy_path in sorted(step_dir.glob("*.npy")):
+                try:
+                    header, values = _open_grid(
+                        str(npy_path),
+                        npy_path.stat().st_mtime_ns,
+                        npy_path.with_suffix(".json").stat().st_mtime_ns,
+                    )
+                except (OSError, ValueError):
+                    # ingest が書き換えている途中。このグリッドは今回は使わない
+                    continue
+                grids[header["variable"]] = (header, values)
+            if grids:
+                steps.append(grids)
+        return steps
+
+    def point(
+        self,
+        lat: float,
+        lon: float,
+        run_time: datetime | None = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        最寄り格子点 1 点の全 step を返す（ForecastRead と同じキーの dict）。
+        グリッド外の点なら空リスト。
+        """
+        run_time = run_time or self.latest_run()
+        if run_time is None or not self.has_run(run_time):
+            return []
+
+        records: List[Dict[str, Any]] = []
+        for grids in self._steps(run_time):
+            record: Dict[str, Any] | None = None
+            for variable, (header, values) in grids.items():
+                grid = _grid_from_header(header)
+                i, j, inside = grid.locate(lat, lon)
+                if not inside:
+                    continue
+                if record is None:
+                    g_lat, g_lon = grid.index_to_latlon(i, j)
+                    record = _base_record(header, float(g_lat), float(g_lon) % 360.0)
+                value = float(values[i, j])
+                record[variable] = None if np.isnan(value) else value
+            if record is not None:
+                records.append(record)
+        return records
+
+    def bbox(
+        self,
+        lat_min: float,
+        lat_max: float,
+        lon_min: float,
+        lon_max: float,
+        run_time: datetime | None = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        矩形 [lat_min, lat_max] x [lon_min, lon_max] に入る格子点の全 step を返す。
+        memmap のスライス（コピーなしのビュー）から値を取り出す。
+        """
+        run_time = run_time or self.latest_run()
+        if run_time is None or not self.has_run(run_time):
+            return []
+
+        records: List[Dict[str, Any]] = []
+        for grids in self._steps(run_time):
+            columns: Dict[str, np.ndarray] = {}
+            header = None
+            lat_sel = lon_sel = None
+            for variable, (var_header, values) in grids.items():
+                grid = _grid_from_header(var_header)
+                rows = grid.lat_slice(lat_min, lat_max)
+                cols = grid.lon_index(lon_min, lon_max)
+                if rows is None or cols is None:
+                    continue
+                if header is None:
+                    header = var_header
+                    lat_sel = grid.latitudes()[rows]
+                    lon_sel = np.mod(grid.longitudes()[cols], 360.0)
+                columns[variable] = values[rows, cols]
+            if header is None:
+                continue
+
+            lat_grid, lon_grid = np.meshgrid(lat_sel, lon_sel, indexing="ij")
+            flat = {name: np.asarray(v, dtype=np.float64).ravel() for name, v in columns.items()}
+            for k, (g_lat, g_lon) in enumerate(zip(lat_grid.ravel().tolist(), lon_grid.ravel().tolist())):
+                record = _base_record(header, g_lat, g_lon)
+                for name, v in flat.items():
+                    record[name] = None if np.isnan(v[k]) else float(v[k])
+                records.append(record)
+        return records
+
+
+def _grid_from_header(header: dict) -> GridSpec:
+    return GridSpec(
+        lat0=header["lat0"],
+        lon0=header["lon0"],
+        dlat=header["dlat"],
+        dlon=header["dlon"],
+        nlat=header["nlat"],
+        nlon=header["nlon"],
+    )
+
+
+def _base_record(header: dict, lat: float, lon: float) -> Dict[str, Any]:
+    return {
+        "id": None,
+        "run_time": datetime.fromisoformat(header["run_time"]),
+        "forecast_time": datetime.fromisoformat(header["forecast_time"]),
+        "lat": lat,
+        "lon": lon,
+    }
+
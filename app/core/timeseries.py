@@ -0,0 +1,74 @@
+# app/core/timeseries.py
+
+"""
+予報ステップ（例: 6時間おき）の値を、任意の時間間隔に時間内挿するモジュール。
+
+NumPy でまとめて計算するので、変数が何個あっても Python のループは回らない。
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+def build_time_axis(start: datetime, end: datetime, interval: timedelta) -> np.ndarray:
+    """
+    start〜end（両端含む）を interval 刻みにした datetime64[s] 配列を作る。
+    end が interval の倍数からずれているときは end を超えない最後の時刻まで。
+    """
+    step = np.timedelta64(int(interval.total_seconds()), "s")
+    n = count_time_steps(start, end, interval)
+    return np.datetime64(start, "s") + np.arange(n) * step
+
+
+def count_time_steps(start: datetime, end: datetime, interval: timedelta) -> int:
+    """
+    build_time_axis(start, end, interval) の長さを、配列を作らずに求める。
+    （レスポンスの大きさを DB に問い合わせる前に見積もるため）
+    """
+    return int((end - start) // interval) + 1
+
+
+def interpolate_linear(
+    src_times: np.ndarray,
+    src_values: np.ndarray,
+    dst_times: np.ndarray,
+) -> np.ndarray:
+    """
+    時間方向の線形内挿。
+
+    - src_times : (n,)   予報ステップの時刻（昇順, datetime64）
+    - src_values: (n, k) 各時刻の k 個の変数（欠損は NaN）
+    - dst_times : (m,)   出力したい時刻（datetime64）
+
+    戻り値は (m, k)。予報ステップの範囲外の時刻は NaN になる。
+    前後どちらかのステップが NaN なら、その時刻の値も NaN になる。
+    """
+    src_values = np.asarray(src_values, dtype=np.float64)
+    n = src_times.shape[0]
+    out = np.full((dst_times.shape[0], src_values.shape[1]), np.nan)
+    if n == 0:
+        return out
+
+    x = src_times.astype("datetime64[s]").astype(np.int64)
+    xq = dst_times.astype("datetime64[s]").astype(np.int64)
+
+    if n == 1:
+        hit = xq == x[0]
+        out[hit] = src_values[0]
+        return out
+
+    # xq を挟む区間 [x[idx], x[idx+1]] の左端インデックス
+    idx = np.clip(np.searchsorted(x, xq, side="right") - 1, 0, n - 2)
+    x0 = x[idx]
+    x1 = x[idx + 1]
+    w = ((xq - x0) / (x1 - x0))[:, None]
+
+    out = src_values[idx] * (1.0 - w) + src_values[idx + 1] * w
+    out[(xq < x[0]) | (xq > x[-1])] = np.nan
+    return out
+
+
+def to_json_list(values: np.ndarray) -> list:
+    """NaN を None に置き換えた list にする（JSON では NaN を返せないため）。"""
+    return [None if np.isnan(v) else float(v) for v in values]
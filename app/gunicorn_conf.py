@@ -0,0 +1,34 @@
+# app/gunicorn_conf.py
+
+"""
+本番用の gunicorn 設定（uvicorn-worker パッケージのワーカーで FastAPI を動かす）。
+
+  gunicorn -c gunicorn_conf.py main:app
+
+- preload_app: 親プロセスで app を 1 回だけ import してから fork する
+               → ワーカー起動が速く、コードのメモリも共有される
+- DB の engine は fork 後に各ワーカーで作る（core.db.get_engine）
+- テーブル作成はここではやらない（python -m migrate で事前に 1 回）
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # 親プロセスで engine が作られていた場合に備えて、ワーカー側で手放しておく
+    from core.db import dispose_engine
+
+    dispose_engine()
@@ -13,6 +13,8 @@ import pandas as pd
 from math import atan2, degrees
 import numpy as np
 
+from ingest.subset import SubsetConfig, apply_subset
+
 
 # 気象庁 GPV サンプル ZIP
 JMA_ZIP_URL = "https://www.data.jma.go.jp/developer/gpv_sample/gsm_gl.zip"
@@ -54,20 +56,25 @@ def extract_grib_from_zip() -> None:
     print(f"[preview] Extracted GRIB -> {GRIB_PATH}")
 
 
-def open_dataset() -> xr.Dataset:
+def open_dataset(subset: SubsetConfig | None = None) -> xr.Dataset:
     """
     GRIB2 を xarray+cfgrib で開く。
 
     サンプルは等圧面 (isobaricInhPa) の gh/u/v/t/w が入っているので、
     cfgrib から提示された filter_by_keys に従ってフィルタをかける。
+    subset があれば、run_ingest.py と同じく変数・レベル・領域で絞り込む。
     """
     print(f"[preview] Open GRIB with xarray+cfgrib -> {GRIB_PATH}")
+    # さっきのエラーが教えてくれた組み合わせ
+    filter_by_keys = {
+        "stepType": "instant",
+        "numberOfPoints": 65160,
+    }
+    if subset is not None:
+        filter_by_keys = subset.filter_by_keys(filter_by_keys)
+
     backend_kwargs = {
-        # さっきのエラーが教えてくれた組み合わせ
-        "filter_by_keys": {
-            "stepType": "instant",
-            "numberOfPoints": 65160,
-        },
+        "filter_by_keys": filter_by_keys,
         "errors": "ignore",
     }
 
@@ -76,6 +83,8 @@ def open_dataset() -> xr.Dataset:
         engine="cfgrib",
         backend_kwargs=backend_kwargs,
     )
+    if subset is not None:
+        ds = apply_subset(ds, subset)
 
     print("[preview] Dataset summary:")
     print(ds)
@@ -96,7 +105,8 @@ def build_power_related_samples(ds: xr.Dataset, limit: int = 30) -> List[Dict[st
         * u, v: 風の東西・南北成分 → 風速・風向に変換
     """
     # 代表として 1 つ目の気圧レベルを使う
-    ds_level = ds.isel(isobaricInhPa=0)
+    # （INGEST_LEVELS で 1 レベルだけ選ぶと次元ではなくスカラー座標になる）
+    ds_level = ds.isel(isobaricInhPa=0) if "isobaricInhPa" in ds.dims else ds
 
     # 必要な変数だけ DataFrame にする
     vars_to_use = []
@@ -171,7 +181,7 @@ def main() -> None:
 
     download_sample_zip()
     extract_grib_from_zip()
-    ds = open_dataset()
+    ds = open_dataset(SubsetConfig.from_env())
 
     samples = build_power_related_samples(ds, limit=30)
 
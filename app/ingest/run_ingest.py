@@ -4,12 +4,18 @@ from datetime import datetime
 from pathlib import Path
 import zipfile
 
+import numpy as np
+import pandas as pd
 import requests
 import xarray as xr
 from sqlalchemy.orm import Session
 
-from core.db import Base, engine, SessionLocal
-from models.forecast import Forecast
+from core.db import init_db, get_engine, SessionLocal
+from core.grid import GridSpec
+from core.grid_store import GRID_STORE_DIR, remove_runs, write_grid
+from ingest.subset import SubsetConfig, apply_subset
+from models.forecast import Forecast, ForecastCompact, USE_COMPACT_FORECASTS
+from schemas.forecast import COMPACT_SCALES, encode_compact
 
 
 # 気象庁 GPV サンプル（GSM全球）の ZIP
@@ -22,15 +28,15 @@ BASE_DIR = Path(__file__).resolve().parent.parent   # .../app
 RAW_DIR = BASE_DIR / "data" / "raw" / "gsm_gl"
 RAW_DIR.mkdir(parents=True, exist_ok=True)
 
-
-def init_db() -> None:
-    """
-    Base を継承したすべてのモデルのテーブルを作成する。
-
-    すでにテーブルが存在する場合は何もしないので、
-    毎回呼んで OK。
-    """
-    Base.metadata.create_all(bind=engine)
+# Forecast の各カラムに入れる地上の変数: カラム名 -> (cfgrib の変数名, 加算する値, 単位)
+# DB とグリッドストアの両方がここから値を取る（グリッドストアは DB の読み取りコピー）。
+# JMA サンプル (GSM 全球) は等圧面の gh/u/v/t/w しか持たないので、どれも見つからず NULL になる。
+SURFACE_VARIABLES = {
+    "temp_2m": ("t2m", -273.15, "degC"),     # K -> ℃
+    "wind10m_u": ("u10", 0.0, "m s-1"),
+    "wind10m_v": ("v10", 0.0, "m s-1"),
+    "ghi": ("dswrf", 0.0, "W m-2"),
+}
 
 
 # ===== ここから JMA サンプル用の処理を追加 =====
@@ -81,7 +87,11 @@ def extract_first_grib(zip_path: Path) -> Path:
     return out_path
 
 
-def open_dataset(grib_path: Path, filter_by_keys: dict | None = None) -> xr.Dataset:
+def open_dataset(
+    grib_path: Path,
+    filter_by_keys: dict | None = None,
+    subset: SubsetConfig | None = None,
+) -> xr.Dataset:
     """
     GRIB2 を xarray+cfgrib で開く。
     filter_by_keys を指定すると、その条件に合うメッセージだけを読む。
@@ -89,11 +99,17 @@ def open_dataset(grib_path: Path, filter_by_keys: dict | None = None) -> xr.Data
     例:
       filter_by_keys={"stepType": "instant"}
       filter_by_keys={"stepType": "accum"}
+
+    subset を指定すると、変数・レベルは filter_by_keys に足して、
+    領域はデコード前の Dataset の切り出しで絞り込む（ingest.subset）。
     """
     print(f"[ingest] Open GRIB with xarray+cfgrib -> {grib_path}")
     backend_kwargs: dict = {"indexpath": ""}
 
-    if filter_by_keys is not None:
+    if subset is not None:
+        filter_by_keys = subset.filter_by_keys(filter_by_keys)
+
+    if filter_by_keys:
         backend_kwargs["filter_by_keys"] = filter_by_keys
         print(f"[ingest]   with filter_by_keys={filter_by_keys}")
 
@@ -102,31 +118,122 @@ def open_dataset(grib_path: Path, filter_by_keys: dict | None = None) -> xr.Data
         engine="cfgrib",
         backend_kwargs=backend_kwargs,
     )
+
+    if subset is not None:
+        print(f"[ingest]   with subset bbox={subset.bbox}")
+        ds = apply_subset(ds, subset)
     return ds
 
 
+def surface_fields(ds: xr.Dataset) -> dict[str, xr.DataArray]:
+    """
+    SURFACE_VARIABLES に従って、Forecast のカラム名 -> 値の DataArray を作る。
+    Dataset に無い変数は含めない（そのカラムは NULL になる）。
+
+    FORECAST_SCHEMA=compact のときは、DB に入る精度（COMPACT_SCALES）に丸めておく。
+    こうしておくと DB とグリッドストアがまったく同じ値を持つ。
+    """
+    fields: dict[str, xr.DataArray] = {}
+    for column, (source, offset, _units) in SURFACE_VARIABLES.items():
+        if source not in ds.data_vars:
+            print(f"[ingest]   {source} not in dataset, {column} will be NULL")
+            continue
+
+        da = ds[source] + offset
+        extra_dims = set(da.dims) - {"step", "latitude", "longitude"}
+        if extra_dims:
+            raise RuntimeError(f"unexpected dims {da.dims} for {source} ({column})")
+
+        scale = COMPACT_SCALES[column] if USE_COMPACT_FORECASTS else None
+        if scale is not None:
+            da = np.round(da * scale) / scale
+        fields[column] = da
+    return fields
+
+
+def forecast_steps(ds: xr.Dataset) -> tuple[datetime, list[tuple[object, datetime]]]:
+    """
+    run_time と、各 step の (step の値, forecast_time) を返す。
+    step が次元でない（1 ステップだけの）ときは step の値を None にする。
+    """
+    run_time = pd.Timestamp(ds["time"].values).to_pydatetime()
+    if "step" in ds.dims:
+        steps = list(ds["step"].values)
+    else:
+        steps = [None]
+
+    result = []
+    for step in steps:
+        if step is not None:
+            delta = step
+        elif "step" in ds.coords:
+            delta = ds["step"].values     # スカラー座標の step
+        else:
+            delta = 0
+        result.append((step, run_time + pd.Timedelta(delta).to_pytimedelta()))
+    return run_time, result
+
+
+def write_grid_store(
+    fields: dict[str, xr.DataArray],
+    grid: GridSpec,
+    run_time: datetime,
+    steps: list[tuple[object, datetime]],
+    root: Path = GRID_STORE_DIR,
+) -> int:
+    """
+    DB に入れたのと同じ値（surface_fields）を、各 step・各変数の 2 次元グリッド (lat, lon)
+    としてグリッドストア（core.grid_store）に書き出す。API はここを memmap で読む。
+    書いたグリッド数を返す。
+
+    DB の forecasts は毎回入れ替わるので、書く前に既存の run（同じ run_time も含む）を
+    すべて消す。消している間と書いている間は、API は DB から返す。
+    """
+    removed = remove_runs(root)
+    if removed:
+        print(f"[ingest] removed {removed} old runs from {root}")
+
+    written = 0
+    for column, field in fields.items():
+        for step, forecast_time in steps:
+            da = field if step is None else field.sel(step=step)
+            write_grid(
+                root,
+                run_time,
+                forecast_time,
+                column,
+                da.values,
+                grid,
+                units=SURFACE_VARIABLES[column][2],
+            )
+            written += 1
+
+    print(f"[ingest] wrote {written} grids to {root}")
+    return written
+
 
 def insert_forecasts_from_jma_sample(db: Session) -> None:
     """
     気象庁 GPV サンプル（GSM 全球）を 1 ファイルだけ読み込み、
-    forecasts テーブルに「とりあえず何点か」INSERT する。
+    対象領域（INGEST_BBOX）の全格子点・全 step を forecasts テーブルに INSERT する。
 
-    ※ ここではまだ temp_2m / wind10m_u などの中身は埋めていない。
-      （まずは pipeline 動作確認用）
+    temp_2m / wind10m_u などは SURFACE_VARIABLES の地上変数から埋める。
+    サンプルには地上変数が無いので NULL になる。
     """
-    # 既に forecasts が埋まっているならスキップ（今までと同じロジック）
-    deleted = db.query(Forecast).delete()
-    db.commit()
-    print(f"[ingest] deleted {deleted} existing forecasts rows.")
+    # FORECAST_SCHEMA=compact なら forecasts_compact に入れる
+    model = ForecastCompact if USE_COMPACT_FORECASTS else Forecast
+
     # 1. ZIP ダウンロード → GRIB 展開
     zip_path = download_sample_zip()
     grib_path = extract_first_grib(zip_path)
 
     # 2. GRIB を開く
     # ds = open_dataset(grib_path)
+    # 領域・変数・レベルは INGEST_* 環境変数で指定（既定: 日本周辺）
     ds = open_dataset(
     grib_path,
     filter_by_keys={"stepType": "instant", "numberOfPoints": 65160},
+    subset=SubsetConfig.from_env(),
 )
 
 
@@ -134,54 +241,61 @@ def insert_forecasts_from_jma_sample(db: Session) -> None:
     print("[ingest] Dataset summary:")
     print(ds)
 
-    # 3. DataFrame に変換して、先頭の数点だけ Forecast に変換する
-    #   実際には time, step, latitude, longitude を使って
-    #   run_time / forecast_time / lat / lon を作るイメージ
-    df = ds.to_dataframe().reset_index()
-
-    # 行数が膨大になるので、まずは 10 点だけに絞る
-    sample_df = df.head(10)
-
-    rows: list[Forecast] = []
-
-    for _, row in sample_df.iterrows():
-        # time / step があれば forecast_time = time + step みたいにする
-        # なければ、とりあえず今の UTC を入れておく
-        time_val = row.get("time")
-        step_val = row.get("step")
-
-        if isinstance(time_val, datetime):
-            run_time = time_val
-        else:
-            run_time = datetime.utcnow()
-
-        if isinstance(time_val, datetime) and step_val is not None:
-            try:
-                forecast_time = time_val + step_val
-            except Exception:
-                forecast_time = run_time
-        else:
-            forecast_time = run_time
-
-        lat = float(row.get("latitude"))
-        lon = float(row.get("longitude"))
-
-        f = Forecast(
-            run_time=run_time,
-            forecast_time=forecast_time,
-            lat=lat,
-            lon=lon,
-            # ★ ここは後で GRIB の変数名に合わせて埋めていく
-            temp_2m=None,
-            wind10m_u=None,
-            wind10m_v=None,
-            ghi=None,
-        )
-        rows.append(f)
-
+    # 3. 地上の変数を取り出し、対象領域の全格子点を Forecast にする
+    #   DB とグリッドストアは同じ fields から作る
+    fields = surface_fields(ds)
+    run_time, steps = forecast_steps(ds)
+    grid = GridSpec.from_coords(ds["latitude"].values, ds["longitude"].values)
+
+    lat2d, lon2d = np.meshgrid(ds["latitude"].values, ds["longitude"].values, indexing="ij")
+    lats = lat2d.ravel().tolist()
+    lons = lon2d.ravel().tolist()
+
+    rows: list[Forecast | ForecastCompact] = []
+
+    for step, forecast_time in steps:
+        columns = {
+            column: (field if step is None else field.sel(step=step)).values.ravel()
+            for column, field in fields.items()
+        }
+        for k, (lat, lon) in enumerate(zip(lats, lons)):
+            values = dict(
+                run_time=run_time,
+                forecast_time=forecast_time,
+                lat=lat,
+                lon=lon,
+                temp_2m=None,
+                wind10m_u=None,
+                wind10m_v=None,
+                ghi=None,
+            )
+            for column, array in columns.items():
+                value = float(array[k])
+                values[column] = None if np.isnan(value) else value
+
+            if USE_COMPACT_FORECASTS:
+                f = ForecastCompact(**encode_compact(**values))
+            else:
+                f = Forecast(**values)
+            rows.append(f)
+
+    # 4. 既存の行の削除と INSERT を 1 トランザクションで行う
+    #   （GRIB の取得・読み込みに失敗しても、既存のデータは消えない）
+    deleted = db.query(model).delete()
+    print(f"[ingest] deleted {deleted} existing {model.__tablename__} rows.")
     db.add_all(rows)
     db.commit()
-    print(f"[ingest] inserted {len(rows)} forecast rows from JMA sample.")
+    print(f"[ingest] inserted {len(rows)} {model.__tablename__} rows from JMA sample.")
+
+    # 5. DB（正）のコミットが済んでから、読み取りコピーのグリッドストアを書く
+    #   グリッドストアは派生データなので、書けなくても ingest 自体は失敗にしない
+    try:
+        written = write_grid_store(fields, grid, run_time, steps)
+    except (OSError, ValueError) as e:
+        print(f"[ingest] failed to write grid store ({e}); API will read this run from the DB.")
+        return
+    if written == 0:
+        print("[ingest] no surface fields to write; API will read this run from the DB.")
 
 
 # ===== ここまで 新しい ingest ロジック =====
@@ -189,9 +303,10 @@ def insert_forecasts_from_jma_sample(db: Session) -> None:
 
 def main() -> None:
     print("[ingest] Start ingest script.")
+    # forecasts テーブルがまだなければ作る（python -m migrate と同じ処理）
     init_db()
 
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         # ここを insert_dummy_forecasts から差し替える
         insert_forecasts_from_jma_sample(db)
@@ -0,0 +1,121 @@
+# app/ingest/subset.py
+
+"""
+GRIB から「必要な領域・変数・レベルだけ」を読むための設定とヘルパー。
+
+全球・全等圧面を DataFrame にしてから捨てるのではなく、
+  1. 変数・レベル → cfgrib の filter_by_keys に渡す（対象外のメッセージはデコードしない）
+  2. 領域 (bbox)  → 開いた直後の（まだ遅延読み込みの）Dataset を isel で切り出す
+の順で絞り込んでから値を読む。run_ingest.py / preview_grib.py の両方で使う。
+
+環境変数で設定する:
+  INGEST_BBOX           "lat_min,lat_max,lon_min,lon_max"（既定: 日本周辺）
+                        "global" にすると全球
+  INGEST_VARIABLES      GRIB の shortName をカンマ区切り（例: "t,u,v", 地上なら "2t,10u,10v"）。
+                        空なら全部。xarray 上の変数名（t2m, u10 など）とは違うので注意
+  INGEST_LEVELS         レベル値をカンマ区切り（例: "1000,850"）。空なら全部
+  INGEST_TYPE_OF_LEVEL  typeOfLevel（例: "isobaricInhPa", "surface"）。空なら指定なし
+"""
+
+import os
+from dataclasses import dataclass
+
+import xarray as xr
+
+from core.grid import GridSpec
+
+
+# 日本周辺（lat_min, lat_max, lon_min, lon_max）
+JAPAN_BBOX = (20.0, 50.0, 120.0, 150.0)
+
+
+@dataclass(frozen=True)
+class SubsetConfig:
+    bbox: tuple[float, float, float, float] | None = JAPAN_BBOX
+    variables: tuple[str, ...] | None = None
+    levels: tuple[float, ...] | None = None
+    type_of_level: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "SubsetConfig":
+        return cls(
+            bbox=_parse_bbox(os.getenv("INGEST_BBOX", "")),
+            variables=_parse_list(os.getenv("INGEST_VARIABLES", ""), str),
+            levels=_parse_list(os.getenv("INGEST_LEVELS", ""), float),
+            type_of_level=os.getenv("INGEST_TYPE_OF_LEVEL") or None,
+        )
+
+    def filter_by_keys(self, base: dict | None = None) -> dict:
+        """
+        cfgrib の filter_by_keys を作る。base（stepType など既存の条件）に
+        変数・レベルの条件を足したもの。
+        """
+        keys = dict(base or {})
+        if self.variables:
+            keys["shortName"] = list(self.variables)
+        if self.levels:
+            keys["level"] = [int(v) if float(v).is_integer() else v for v in self.levels]
+        if self.type_of_level:
+            keys["typeOfLevel"] = self.type_of_level
+        return keys
+
+
+def _parse_bbox(value: str) -> tuple[float, float, float, float] | None:
+    value = value.strip()
+    if not value:
+        return JAPAN_BBOX
+    if value.lower() == "global":
+        return None
+    parts = [float(v) for v in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError(f"INGEST_BBOX must be 'lat_min,lat_max,lon_min,lon_max': {value!r}")
+    lat_min, lat_max, lon_min, lon_max = parts
+    if lat_min > lat_max:
+        raise ValueError(f"INGEST_BBOX lat_min must be <= lat_max: {value!r}")
+    return lat_min, lat_max, lon_min, lon_max
+
+
+def _parse_list(value: str, cast) -> tuple | None:
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    return tuple(cast(v) for v in items) or None
+
+
+def apply_subset(ds: xr.Dataset, config: SubsetConfig) -> xr.Dataset:
+    """
+    開いた直後の Dataset を領域・変数・レベルで絞り込む。
+
+    cfgrib の Dataset は遅延読み込みなので、ここでの isel/sel は
+    値をデコードする前に効く（to_dataframe() などで読むのは切り出した部分だけ）。
+    filter_by_keys で絞れなかった場合の保険として、変数・レベルもここで絞る。
+    """
+    if config.variables:
+        # filter_by_keys と同じく shortName で照合する。
+        # xarray の変数名は cfVarName（2t -> t2m, 10u -> u10）なので、GRIB_shortName 属性を見る
+        wanted = set(config.variables)
+        keep = [
+            name
+            for name, da in ds.data_vars.items()
+            if da.attrs.get("GRIB_shortName", name) in wanted
+        ]
+        if not keep:
+            raise RuntimeError(f"指定した変数が GRIB にありません: {config.variables}")
+        ds = ds[keep]
+
+    if config.levels:
+        for dim in ("isobaricInhPa", "heightAboveGround", "level"):
+            if dim in ds.dims:
+                levels = [v for v in config.levels if v in ds[dim].values]
+                if not levels:
+                    raise RuntimeError(f"指定したレベルが GRIB にありません: {config.levels}")
+                ds = ds.sel({dim: levels})
+
+    if config.bbox is not None:
+        lat_min, lat_max, lon_min, lon_max = config.bbox
+        grid = GridSpec.from_coords(ds["latitude"].values, ds["longitude"].values)
+        rows = grid.lat_slice(lat_min, lat_max)
+        cols = grid.lon_index(lon_min, lon_max)
+        if rows is None or cols is None:
+            raise RuntimeError(f"指定した領域がグリッドと重なりません: {config.bbox}")
+        ds = ds.isel(latitude=rows, longitude=cols)
+
+    return ds
@@ -1,27 +1,65 @@
 # app/main.py
 
+from datetime import datetime, timedelta, timezone
 from typing import List
 
-from fastapi import FastAPI, Depends, HTTPException, status
+import numpy as np
+from fastapi import FastAPI, Depends, HTTPException, Query, status
+from sqlalchemy import func, inspect, text, tuple_
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from core.db import Base, engine, SessionLocal
+from core.db import get_engine, SessionLocal
+from core.grid import GSM_GLOBAL
+from core.grid_store import GridStore
+from core.timeseries import (
+    build_time_axis,
+    count_time_steps,
+    interpolate_linear,
+    to_json_list,
+)
 from models.item import Item
 from schemas.item import ItemCreate, ItemRead
 from models.weather import WeatherSample       
 from schemas.weather import WeatherSampleRead 
 
-from models.forecast import Forecast
-from schemas.forecast import ForecastRead
+from models.forecast import Forecast, ForecastCompact, USE_COMPACT_FORECASTS
+from schemas.forecast import (
+    COMPACT_SCALES,
+    ForecastRead,
+    ForecastTimeSeries,
+    ForecastTimeSeriesResponse,
+)
 
+# テーブル作成は import 時ではなく python -m migrate で 1 回だけ行う
+# （ワーカーの起動・リロードのたびに DB へ往復しないため）
+app = FastAPI()
 
+# 点・矩形の読み取りは、あればローカルのグリッドストア（memmap）から返す
+grid_store = GridStore()
 
-Base.metadata.create_all(bind=engine)
+# FORECAST_SCHEMA=compact なら forecasts_compact テーブルを読む
+FORECAST_MODEL = ForecastCompact if USE_COMPACT_FORECASTS else Forecast
+
+# 時系列で返す変数（Forecast のカラム名）
+TIMESERIES_VARIABLES = ("temp_2m", "wind10m_u", "wind10m_v", "ghi")
+# 1リクエストで受け付ける地点数の上限
+TIMESERIES_MAX_SITES = 1000
+# 1リクエストで返す「地点数 × 時刻数」の上限（レスポンスが際限なく大きくならないように）
+TIMESERIES_MAX_POINTS = 200_000
+# interval の上限 [分]（1週間）。大きすぎると timedelta が作れない
+TIMESERIES_MAX_INTERVAL = 7 * 24 * 60
 
-app = FastAPI()
+
+def _to_naive_utc(value: datetime | None) -> datetime | None:
+    """タイムゾーン付きの時刻を naive UTC にする（DB の DateTime は naive UTC で持っている）。"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 
 def get_db() -> Session:
+    get_engine()  # このワーカーで初めてなら engine を作る
     db = SessionLocal()
     try:
         yield db
@@ -34,6 +72,23 @@ def read_root():
     return {"message": "Hello from Docker FastAPI + PostgreSQL"}
 
 
+@app.get("/readyz")
+def readyz():
+    """
+    readiness チェック用。DB に接続でき、マイグレーション済み
+    （forecasts テーブルがある）ならトラフィックを受けてよい。
+    """
+    try:
+        engine = get_engine()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        if not inspect(engine).has_table(FORECAST_MODEL.__tablename__):
+            raise HTTPException(status_code=503, detail="database schema is not migrated")
+    except SQLAlchemyError:
+        raise HTTPException(status_code=503, detail="database is not reachable")
+    return {"status": "ready"}
+
+
 @app.post("/items", response_model=ItemRead, status_code=status.HTTP_201_CREATED)
 def create_item(item_in: ItemCreate, db: Session = Depends(get_db)):
     db_item = Item(**item_in.dict())
@@ -95,12 +150,258 @@ def list_weather_samples(db: Session = Depends(get_db)):
     return samples
 
 @app.get("/forecasts", response_model=List[ForecastRead])
-def list_forecasts(db: Session = Depends(get_db)):
+def list_forecasts(
+    lat: float | None = Query(None, ge=-90, le=90),
+    lon: float | None = Query(None),
+    lat_min: float | None = Query(None, ge=-90, le=90),
+    lat_max: float | None = Query(None, ge=-90, le=90),
+    lon_min: float | None = Query(None),
+    lon_max: float | None = Query(None),
+    run_time: datetime | None = Query(None, description="省略時は最新の予報サイクル"),
+    db: Session = Depends(get_db),
+):
     """
-    Forecast テーブルに入っている予報データを全件返す。
-    実務では本当に全件返すと重すぎるので、
-    ページングや領域・時間フィルタを必ず入れる想定。
-    ここでは「全データJSON」を経験するための実装。
+    Forecast テーブルに入っている予報データを返す。
+
+    - lat/lon を指定        : 最寄り格子点 1 点の全ステップ
+    - lat_min〜lon_max を指定: 矩形に入る格子点の全ステップ
+    - 何も指定しない        : 全件（「全データJSON」を経験するための実装）
+
+    点・矩形の問い合わせは、グリッドストア（ingest が書いた memmap ファイル）に
+    データがあればそこから返し、PostgreSQL には行かない。
+    無ければ従来どおり DB から返す。
     """
-    forecasts = db.query(Forecast).all()
+    point = lat is not None or lon is not None
+    bbox = any(v is not None for v in (lat_min, lat_max, lon_min, lon_max))
+    if point and bbox:
+        raise HTTPException(status_code=422, detail="specify either lat/lon or a bbox, not both")
+    if point and (lat is None or lon is None):
+        raise HTTPException(status_code=422, detail="lat and lon must be given together")
+    if bbox and any(v is None for v in (lat_min, lat_max, lon_min, lon_max)):
+        raise HTTPException(
+            status_code=422,
+            detail="lat_min, lat_max, lon_min and lon_max must be given together",
+        )
+
+    run_time = _to_naive_utc(run_time)
+
+    if (point or bbox) and grid_store.has_run(run_time):
+        if point:
+            return grid_store.point(lat, lon, run_time)
+        return grid_store.bbox(lat_min, lat_max, lon_min, lon_max, run_time)
+
+    if USE_COMPACT_FORECASTS:
+        return _list_forecasts_compact(
+            db, lat, lon, lat_min, lat_max, lon_min, lon_max, run_time, point, bbox
+        )
+
+    query = db.query(Forecast)
+    if point or bbox:
+        if run_time is None:
+            run_time = db.query(func.max(Forecast.run_time)).scalar_subquery()
+        query = query.filter(Forecast.run_time == run_time)
+    if point:
+        g_lat, g_lon = GSM_GLOBAL.nearest_latlon(lat, lon)
+        query = query.filter(Forecast.lat == float(g_lat), Forecast.lon == float(g_lon))
+    if bbox:
+        lo, hi = lon_min % 360.0, lon_max % 360.0
+        query = query.filter(Forecast.lat.between(lat_min, lat_max))
+        if lon_max - lon_min < 360.0:
+            if lo <= hi:
+                query = query.filter(Forecast.lon.between(lo, hi))
+            else:
+                # 0度線をまたぐ矩形
+                query = query.filter((Forecast.lon >= lo) | (Forecast.lon <= hi))
+    if point or bbox:
+        query = query.order_by(Forecast.forecast_time, Forecast.lat, Forecast.lon)
+
+    forecasts = query.all()
     return forecasts
+
+
+def _list_forecasts_compact(
+    db: Session,
+    lat: float | None,
+    lon: float | None,
+    lat_min: float | None,
+    lat_max: float | None,
+    lon_min: float | None,
+    lon_max: float | None,
+    run_time: datetime | None,
+    point: bool,
+    bbox: bool,
+) -> List[ForecastRead]:
+    """
+    list_forecasts の forecasts_compact 版。
+    点・矩形は格子インデックス (grid_i, grid_j) の条件に直して主キーで引く。
+    """
+    query = db.query(ForecastCompact)
+    if point or bbox:
+        if run_time is None:
+            run_time = db.query(func.max(ForecastCompact.run_time)).scalar_subquery()
+        query = query.filter(ForecastCompact.run_time == run_time)
+    if point:
+        i, j = GSM_GLOBAL.nearest_index(lat, lon)
+        query = query.filter(ForecastCompact.grid_i == int(i), ForecastCompact.grid_j == int(j))
+    if bbox:
+        rows = GSM_GLOBAL.lat_slice(lat_min, lat_max)
+        cols = GSM_GLOBAL.lon_index(lon_min, lon_max)
+        if rows is None or cols is None:
+            return []
+        query = query.filter(ForecastCompact.grid_i.between(rows.start, rows.stop - 1))
+        if isinstance(cols, slice):
+            query = query.filter(ForecastCompact.grid_j.between(cols.start, cols.stop - 1))
+        else:
+            query = query.filter(ForecastCompact.grid_j.in_(cols.tolist()))
+    if point or bbox:
+        query = query.order_by(
+            ForecastCompact.forecast_time, ForecastCompact.grid_i, ForecastCompact.grid_j
+        )
+
+    return [ForecastRead.from_compact(row) for row in query.all()]
+
+
+@app.get("/forecasts/timeseries", response_model=ForecastTimeSeriesResponse)
+def get_forecast_timeseries(
+    lat: List[float] = Query(...),
+    lon: List[float] = Query(...),
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    interval: int = Query(60, gt=0, le=TIMESERIES_MAX_INTERVAL, description="出力間隔 [分]"),
+    run_time: datetime | None = Query(None, description="省略時は最新の予報サイクル"),
+    db: Session = Depends(get_db),
+):
+    """
+    複数地点の時系列を、最寄り格子点の予報ステップから時間内挿して返す。
+
+    例: /forecasts/timeseries?lat=35.7&lon=139.7&lat=34.7&lon=135.5
+                              &start=2017-12-05T00:00&end=2017-12-06T00:00&interval=60
+
+    - lat/lon は同じ回数だけ繰り返して複数地点を指定する（何地点でも DB 問い合わせは 1 回）
+    - 内挿は NumPy でまとめて計算する（core.timeseries）
+    - 時刻軸は全地点で共通なので times に 1 回だけ入れる
+    """
+    start, end, run_time = _to_naive_utc(start), _to_naive_utc(end), _to_naive_utc(run_time)
+
+    if len(lat) != len(lon):
+        raise HTTPException(status_code=422, detail="lat and lon must have the same length")
+    if len(lat) > TIMESERIES_MAX_SITES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"too many sites (max {TIMESERIES_MAX_SITES})",
+        )
+    if any(not -90.0 <= v <= 90.0 for v in lat):
+        raise HTTPException(status_code=422, detail="lat must be between -90 and 90")
+    if end < start:
+        raise HTTPException(status_code=422, detail="end must be after start")
+
+    # 時刻軸を作る前（DB に問い合わせる前）にレスポンスの大きさを見積もる
+    n_times = count_time_steps(start, end, timedelta(minutes=interval))
+    if n_times * len(lat) > TIMESERIES_MAX_POINTS:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"too many points: {len(lat)} sites x {n_times} times "
+                f"(max {TIMESERIES_MAX_POINTS}); narrow start/end or increase interval"
+            ),
+        )
+
+    # 各地点 → 最寄り格子点
+    # （forecasts は lat/lon、forecasts_compact は格子インデックスで引く）
+    grid_i, grid_j = GSM_GLOBAL.nearest_index(lat, lon)
+    grid_lat, grid_lon = GSM_GLOBAL.index_to_latlon(grid_i, grid_j)
+    model = FORECAST_MODEL
+    if USE_COMPACT_FORECASTS:
+        keys = list(zip(grid_i.tolist(), grid_j.tolist()))
+        key_columns = (ForecastCompact.grid_i, ForecastCompact.grid_j)
+    else:
+        keys = list(zip(grid_lat.tolist(), grid_lon.tolist()))
+        key_columns = (Forecast.lat, Forecast.lon)
+
+    # run_time 省略時は最新サイクルをサブクエリで決める（往復は増やさない）
+    if run_time is None:
+        run_filter = model.run_time == db.query(func.max(model.run_time)).scalar_subquery()
+    else:
+        run_filter = model.run_time == run_time
+
+    def key_filter():
+        # IN のバインドパラメータは 1 つの式を複数箇所で使い回せないので、毎回作る
+        return tuple_(*key_columns).in_(sorted(set(keys)))
+
+    # start/end を挟む予報ステップ（start 以前の最後・end 以後の最初）まで取る。
+    # ステップ間隔（3h, 6h, 12h...）に依存しないよう、サブクエリで求める（往復は増やさない）
+    first_step = func.coalesce(
+        db.query(func.max(model.forecast_time))
+        .filter(run_filter, key_filter(), model.forecast_time <= start)
+        .scalar_subquery(),
+        start,
+    )
+    last_step = func.coalesce(
+        db.query(func.min(model.forecast_time))
+        .filter(run_filter, key_filter(), model.forecast_time >= end)
+        .scalar_subquery(),
+        end,
+    )
+
+    columns = [getattr(model, name) for name in TIMESERIES_VARIABLES]
+    rows = (
+        db.query(*key_columns, model.forecast_time, model.run_time, *columns)
+        .filter(
+            run_filter,
+            key_filter(),
+            model.forecast_time >= first_step,
+            model.forecast_time <= last_step,
+        )
+        .order_by(*key_columns, model.forecast_time)
+        .all()
+    )
+
+    # forecasts_compact の整数値を物理量に戻すための倍率
+    scales = np.array(
+        [
+            (COMPACT_SCALES[name] or 1) if USE_COMPACT_FORECASTS else 1
+            for name in TIMESERIES_VARIABLES
+        ],
+        dtype=np.float64,
+    )
+
+    # 格子点ごとに (時刻配列, 値配列) にまとめる
+    grouped: dict[tuple, list] = {}
+    for row in rows:
+        grouped.setdefault((row[0], row[1]), []).append(row)
+
+    times = build_time_axis(start, end, timedelta(minutes=interval))
+    empty = np.full((times.shape[0], len(TIMESERIES_VARIABLES)), np.nan)
+
+    interpolated: dict[tuple, np.ndarray] = {}
+    for point, point_rows in grouped.items():
+        src_times = np.array([r[2] for r in point_rows], dtype="datetime64[s]")
+        src_values = np.array(
+            [[np.nan if v is None else v for v in r[4:]] for r in point_rows],
+            dtype=np.float64,
+        ) / scales
+        interpolated[point] = interpolate_linear(src_times, src_values, times)
+
+    series = []
+    for site_lat, site_lon, key, g_lat, g_lon in zip(
+        lat, lon, keys, grid_lat.tolist(), grid_lon.tolist()
+    ):
+        values = interpolated.get(key, empty)
+        series.append(
+            ForecastTimeSeries(
+                lat=site_lat,
+                lon=site_lon,
+                grid_lat=g_lat,
+                grid_lon=g_lon,
+                **{
+                    name: to_json_list(values[:, k])
+                    for k, name in enumerate(TIMESERIES_VARIABLES)
+                },
+            )
+        )
+
+    return ForecastTimeSeriesResponse(
+        run_time=rows[0][3] if rows else run_time,
+        times=times.astype(datetime).tolist(),
+        series=series,
+    )
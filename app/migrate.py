@@ -0,0 +1,27 @@
+# app/migrate.py
+
+"""
+テーブル作成（スキーマ作成）を 1 回だけ実行するスクリプト。
+
+API のワーカーが起動するたびに create_all するのをやめて、
+デプロイ時にこれを 1 回だけ流す:
+
+  python -m migrate
+"""
+
+from core.db import init_db
+
+# Base に登録させるため、全モデルを import しておく
+from models.item import Item  # noqa: F401
+from models.weather import WeatherSample  # noqa: F401
+from models.forecast import Forecast  # noqa: F401
+
+
+def main() -> None:
+    print("[migrate] Create tables.")
+    init_db()
+    print("[migrate] Done.")
+
+
+if __name__ == "__main__":
+    main()
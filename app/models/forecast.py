@@ -1,9 +1,16 @@
 # app/models/forecast.py
 
-from sqlalchemy import Column, Integer, Float, DateTime
+import os
+
+from sqlalchemy import Column, Integer, SmallInteger, Float, REAL, DateTime, Index
 from core.db import Base
 
 
+# "compact" にすると ingest / API は forecasts_compact テーブルを使う
+FORECAST_SCHEMA = os.getenv("FORECAST_SCHEMA", "float")
+USE_COMPACT_FORECASTS = FORECAST_SCHEMA == "compact"
+
+
 class Forecast(Base):
     """
     GRIB2由来の予報データ1点分（1格子・1時刻）のレコード。
@@ -15,6 +22,10 @@ class Forecast(Base):
     """
 
     __tablename__ = "forecasts"
+    __table_args__ = (
+        # 地点ごとの時系列（/forecasts/timeseries）を 1 回のインデックス走査で取るため
+        Index("ix_forecasts_lat_lon_time", "lat", "lon", "forecast_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -29,3 +40,33 @@ class Forecast(Base):
     wind10m_u = Column(Float, nullable=True)    # 10m風U成分 [m/s]
     wind10m_v = Column(Float, nullable=True)    # 10m風V成分 [m/s]
     ghi = Column(Float, nullable=True)          # 全球水平日射量 [W/m2]（仮）
+
+
+class ForecastCompact(Base):
+    """
+    Forecast と同じ内容を、行幅・インデックスを小さくして持つテーブル。
+    （FORECAST_SCHEMA=compact のときに使う）
+
+      - lat, lon の代わりに格子インデックス (grid_i, grid_j)（core.grid.GSM_GLOBAL）
+      - 物理量は有効桁 3 桁程度なので、倍率をかけた SMALLINT か REAL (float4)
+      - サロゲートキー id は持たず、(grid_i, grid_j, run_time, forecast_time) を複合主キーにする
+        → 地点ごとの時系列は主キーのインデックスだけで引ける
+
+    値のエンコード・デコードは schemas.forecast の encode_compact / decode_compact で行う。
+    """
+
+    __tablename__ = "forecasts_compact"
+    __table_args__ = (
+        # 最新サイクル（max(run_time)）を引くため
+        Index("ix_forecasts_compact_run_time", "run_time"),
+    )
+
+    grid_i = Column(SmallInteger, primary_key=True)     # 緯度方向インデックス
+    grid_j = Column(SmallInteger, primary_key=True)     # 経度方向インデックス
+    run_time = Column(DateTime, primary_key=True)
+    forecast_time = Column(DateTime, primary_key=True)
+
+    temp_2m = Column(SmallInteger, nullable=True)       # 2m気温 [℃] ×100
+    wind10m_u = Column(SmallInteger, nullable=True)     # 10m風U成分 [m/s] ×100
+    wind10m_v = Column(SmallInteger, nullable=True)     # 10m風V成分 [m/s] ×100
+    ghi = Column(REAL, nullable=True)                   # 全球水平日射量 [W/m2]
@@ -1,15 +1,33 @@
 # app/schemas/forecast.py
 
+import math
 from datetime import datetime
+from typing import List
+
 from pydantic import BaseModel
 
+from core.grid import GSM_GLOBAL
+
+# forecasts_compact の倍率（SMALLINT に入れる値 = 物理量 × 倍率）。None は REAL でそのまま持つ
+COMPACT_SCALES = {
+    "temp_2m": 100,
+    "wind10m_u": 100,
+    "wind10m_v": 100,
+    "ghi": None,
+}
+_SMALLINT_MIN = -32768
+_SMALLINT_MAX = 32767
+# lat/lon が格子点と一致しているとみなす誤差 [度]
+_GRID_TOLERANCE = 1e-6
+
 
 class ForecastRead(BaseModel):
     """
     Forecastレコード1件をJSONで返すときの形。
+    グリッドストアから返すときは DB の行ではないので id は None。
     """
 
-    id: int
+    id: int | None = None
     run_time: datetime
     forecast_time: datetime
     lat: float
@@ -21,3 +39,109 @@ class ForecastRead(BaseModel):
 
     class Config:
         orm_mode = True
+
+    @classmethod
+    def from_compact(cls, row) -> "ForecastRead":
+        """ForecastCompact の行 → ForecastRead（decode_compact を参照）。"""
+        return cls(**decode_compact(row))
+
+
+def encode_compact(
+    run_time: datetime,
+    forecast_time: datetime,
+    lat: float,
+    lon: float,
+    **values: float | None,
+) -> dict:
+    """
+    Forecast と同じ形の値 → ForecastCompact のカラム値。
+
+    lat/lon は GSM_GLOBAL の格子インデックスに（格子点ちょうどでなければ ValueError）、
+    物理量は COMPACT_SCALES の倍率をかけて整数に丸める。
+
+    - 欠損（None や GRIB/xarray の NaN・inf）は None（NULL）にする
+    - 倍率をかけて SMALLINT に入らない値は、単位の取り違えなどの可能性が高いので
+      丸めずに ValueError にする
+    """
+    grid_i, grid_j, inside = GSM_GLOBAL.locate(lat, lon)
+    if not inside:
+        raise ValueError(f"({lat}, {lon}) is outside the GSM global grid")
+    g_lat, g_lon = GSM_GLOBAL.index_to_latlon(grid_i, grid_j)
+    if abs(g_lat - lat) > _GRID_TOLERANCE or abs((g_lon - lon + 180.0) % 360.0 - 180.0) > _GRID_TOLERANCE:
+        raise ValueError(
+            f"({lat}, {lon}) is not a GSM global grid point "
+            f"(nearest is ({float(g_lat)}, {float(g_lon)}))"
+        )
+    row = {
+        "grid_i": int(grid_i),
+        "grid_j": int(grid_j),
+        "run_time": run_time,
+        "forecast_time": forecast_time,
+    }
+    for name, scale in COMPACT_SCALES.items():
+        value = values.get(name)
+        if value is None or not math.isfinite(value):
+            row[name] = None
+        elif scale is None:
+            row[name] = float(value)
+        else:
+            scaled = round(value * scale)
+            if not _SMALLINT_MIN <= scaled <= _SMALLINT_MAX:
+                raise ValueError(
+                    f"{name}={value} is out of range for forecasts_compact "
+                    f"(x{scale} must fit in SMALLINT)"
+                )
+            row[name] = scaled
+    return row
+
+
+def decode_compact_value(name: str, value: float | None) -> float | None:
+    """ForecastCompact の 1 カラムの値 → 物理量。"""
+    scale = COMPACT_SCALES[name]
+    if value is None or scale is None:
+        return value
+    return value / scale
+
+
+def decode_compact(row) -> dict:
+    """ForecastCompact の行 → ForecastRead と同じキーの dict。"""
+    lat, lon = GSM_GLOBAL.index_to_latlon(row.grid_i, row.grid_j)
+    return {
+        "id": None,
+        "run_time": row.run_time,
+        "forecast_time": row.forecast_time,
+        "lat": float(lat),
+        "lon": float(lon),
+        **{
+            name: decode_compact_value(name, getattr(row, name))
+            for name in COMPACT_SCALES
+        },
+    }
+
+
+class ForecastTimeSeries(BaseModel):
+    """
+    1地点分の時系列。値の配列は ForecastTimeSeriesResponse.times と同じ並び。
+
+    lat/lon はリクエストされた地点、grid_lat/grid_lon は実際に使った最寄り格子点。
+    """
+
+    lat: float
+    lon: float
+    grid_lat: float
+    grid_lon: float
+    temp_2m: List[float | None]
+    wind10m_u: List[float | None]
+    wind10m_v: List[float | None]
+    ghi: List[float | None]
+
+
+class ForecastTimeSeriesResponse(BaseModel):
+    """
+    GET /forecasts/timeseries のレスポンス。
+    時刻軸は全地点で共通なので 1 回だけ返す（配列をコンパクトにするため）。
+    """
+
+    run_time: datetime | None = None
+    times: List[datetime]
+    series: List[ForecastTimeSeries]
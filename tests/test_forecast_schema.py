@@ -0,0 +1,51 @@
+# tests/test_forecast_schema.py
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from schemas.forecast import ForecastRead, decode_compact, encode_compact
+
+
+RUN = datetime(2017, 12, 5)
+
+
+def test_encode_decode_round_trip():
+    row = encode_compact(
+        RUN, RUN, 35.0, 139.0,
+        temp_2m=6.871, wind10m_u=-1.234, wind10m_v=None, ghi=812.5,
+    )
+    assert (row["grid_i"], row["grid_j"]) == (55, 139)
+    assert row["temp_2m"] == 687 and row["wind10m_u"] == -123
+
+    decoded = decode_compact(SimpleNamespace(**row))
+    assert decoded["lat"] == 35.0 and decoded["lon"] == 139.0
+    assert decoded["temp_2m"] == pytest.approx(6.87)
+    assert decoded["wind10m_u"] == pytest.approx(-1.23)
+    assert decoded["wind10m_v"] is None
+    assert decoded["ghi"] == 812.5
+
+    read = ForecastRead.from_compact(SimpleNamespace(**row))
+    assert read.id is None and read.forecast_time == RUN
+
+
+def test_encode_accepts_negative_longitude():
+    row = encode_compact(RUN, RUN, 35.0, -221.0)
+    assert (row["grid_i"], row["grid_j"]) == (55, 139)
+
+
+def test_encode_maps_non_finite_to_none():
+    row = encode_compact(RUN, RUN, 0.0, 0.0, temp_2m=float("nan"), ghi=float("inf"))
+    assert row["temp_2m"] is None and row["ghi"] is None
+
+
+def test_encode_rejects_out_of_range_value():
+    with pytest.raises(ValueError, match="temp_2m"):
+        encode_compact(RUN, RUN, 0.0, 0.0, temp_2m=500.0)
+
+
+@pytest.mark.parametrize("lat, lon", [(35.7, 139.0), (35.0, 139.5), (91.0, 0.0)])
+def test_encode_rejects_points_off_the_grid(lat, lon):
+    with pytest.raises(ValueError):
+        encode_compact(RUN, RUN, lat, lon)
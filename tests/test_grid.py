@@ -0,0 +1,60 @@
+# tests/test_grid.py
+
+import numpy as np
+import pytest
+
+from core.grid import GSM_GLOBAL, GridSpec
+
+
+@pytest.mark.parametrize(
+    "lat, lon, expected",
+    [
+        (35.7, 139.7, (36.0, 140.0)),
+        (35.0, -221.0, (35.0, 139.0)),    # -180〜180 の経度
+        (0.0, 359.6, (0.0, 0.0)),         # 360 度で 0 度に巡回する
+        (-95.0, 10.0, (-90.0, 10.0)),     # グリッド外は端に寄せる
+    ],
+)
+def test_nearest_latlon(lat, lon, expected):
+    g_lat, g_lon = GSM_GLOBAL.nearest_latlon(lat, lon)
+    assert (float(g_lat), float(g_lon)) == expected
+
+
+def test_locate_marks_points_outside_grid():
+    _, _, inside = GSM_GLOBAL.locate([0.0, 91.0], [0.0, 0.0])
+    assert inside.tolist() == [True, False]
+
+
+def test_lat_slice_on_north_to_south_grid():
+    rows = GSM_GLOBAL.lat_slice(20.0, 50.0)
+    lats = GSM_GLOBAL.latitudes()[rows]
+    assert lats[0] == 50.0 and lats[-1] == 20.0 and lats.size == 31
+
+
+def test_lon_index_contiguous_is_slice():
+    cols = GSM_GLOBAL.lon_index(120.0, 150.0)
+    assert cols == slice(120, 151)
+
+
+def test_lon_index_full_circle():
+    assert GSM_GLOBAL.lon_index(-180.0, 180.0) == slice(0, 360)
+
+
+def test_lon_index_outside_regional_grid_is_none():
+    grid = GridSpec(lat0=50.0, lon0=120.0, dlat=-1.0, dlon=1.0, nlat=31, nlon=31)
+    assert grid.lon_index(0.0, 10.0) is None
+
+
+def test_lon_index_wrap_is_ordered_west_to_east():
+    cols = GSM_GLOBAL.lon_index(-10.0, 10.0)
+    assert isinstance(cols, np.ndarray)
+    lons = GSM_GLOBAL.longitudes()[cols]
+    assert lons.tolist() == list(range(350, 360)) + list(range(0, 11))
+
+    # 切り出した座標から作った GridSpec でも位置が正しく引ける
+    sub = GridSpec.from_coords(GSM_GLOBAL.latitudes(), lons)
+    assert (sub.lon0, sub.dlon, sub.nlon) == (350.0, 1.0, 21)
+    _, j, inside = sub.locate(0.0, 5.0)
+    assert bool(inside) and lons[int(j)] == 5.0
+    _, _, inside = sub.locate(0.0, 11.0)
+    assert not bool(inside)
@@ -0,0 +1,75 @@
+# tests/test_timeseries.py
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from core.timeseries import (
+    build_time_axis,
+    count_time_steps,
+    interpolate_linear,
+    to_json_list,
+)
+
+
+T0 = np.datetime64("2017-12-05T00:00", "s")
+
+
+def hours(*values):
+    return T0 + np.array(values, dtype="timedelta64[h]")
+
+
+@pytest.mark.parametrize(
+    "start, end, interval",
+    [
+        (datetime(2017, 12, 5), datetime(2017, 12, 5), timedelta(hours=1)),
+        (datetime(2017, 12, 5), datetime(2017, 12, 6), timedelta(hours=1)),
+        (datetime(2017, 12, 5), datetime(2017, 12, 5, 10), timedelta(hours=3)),
+        (datetime(2017, 12, 5), datetime(2017, 12, 5, 0, 59), timedelta(minutes=7)),
+    ],
+)
+def test_count_time_steps_matches_build_time_axis(start, end, interval):
+    axis = build_time_axis(start, end, interval)
+    assert count_time_steps(start, end, interval) == axis.shape[0]
+    assert axis[0] == np.datetime64(start, "s")
+    assert axis[-1] <= np.datetime64(end, "s")
+
+
+def test_build_time_axis_includes_end():
+    axis = build_time_axis(datetime(2017, 12, 5), datetime(2017, 12, 5, 6), timedelta(hours=3))
+    assert axis.tolist() == hours(0, 3, 6).astype(datetime).tolist()
+
+
+def test_interpolate_linear_between_steps():
+    out = interpolate_linear(hours(0, 6), np.array([[0.0, 10.0], [6.0, 4.0]]), hours(0, 3, 6))
+    np.testing.assert_allclose(out, [[0.0, 10.0], [3.0, 7.0], [6.0, 4.0]])
+
+
+def test_interpolate_linear_out_of_range_is_nan():
+    out = interpolate_linear(hours(6, 12), np.array([[1.0], [2.0]]), hours(0, 6, 12, 18))
+    assert np.isnan(out[0, 0]) and np.isnan(out[3, 0])
+    np.testing.assert_allclose(out[1:3, 0], [1.0, 2.0])
+
+
+def test_interpolate_linear_nan_neighbour_only_affects_its_interval():
+    src = np.array([[0.0], [np.nan], [12.0], [18.0]])
+    out = interpolate_linear(hours(0, 6, 12, 18), src, hours(3, 9, 15))
+    assert np.isnan(out[0, 0]) and np.isnan(out[1, 0])
+    assert out[2, 0] == pytest.approx(15.0)
+
+
+def test_interpolate_linear_single_step():
+    out = interpolate_linear(hours(6), np.array([[5.0]]), hours(0, 6, 12))
+    assert np.isnan(out[0, 0]) and np.isnan(out[2, 0])
+    assert out[1, 0] == 5.0
+
+
+def test_interpolate_linear_no_steps():
+    out = interpolate_linear(hours()[:0], np.empty((0, 2)), hours(0, 1))
+    assert out.shape == (2, 2)
+    assert np.isnan(out).all()
+
+
+def test_to_json_list_maps_nan_to_none():
+    assert to_json_list(np.array([1.5, np.nan])) == [1.5, None]